@@ -1,9 +1,12 @@
 import requests
 import xml.etree.ElementTree as ET
 from typing import List, Dict, Any, Optional
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
+from cache import get_cache, DEFAULT_TTL
 
 
+ABS_HOST = "abs.gov.au"
+
 def get_abs_data(category_id: str) -> Dict[str, Any]:
     """
     Get ABS data for a specific category ID.
@@ -114,6 +117,43 @@ def get_abs_data(category_id: str) -> Dict[str, Any]:
         raise Exception(f"Error processing ABS data for category {category_id}: {str(e)}")
 
 
+def get_abs_data_cached(category_id: str, ttl: Optional[float] = DEFAULT_TTL) -> Dict[str, Any]:
+    """
+    Get ABS data for a category, reusing a cached response when available.
+    
+    Results are stored in the shared cache backend, so every worker on the host
+    reuses one fetch, and concurrent misses for the same category wait for the
+    first request instead of querying ABS again.
+    
+    Args:
+        category_id (str): The ABS category ID
+        ttl (float, optional): Seconds to keep the cached response
+    
+    Returns:
+        Dict[str, Any]: Same structure as get_abs_data
+        
+    Raises:
+        requests.RequestException: If the API request fails
+        Exception: For other errors
+    """
+    return get_cache().get_or_compute(f"abs_data:{category_id}", lambda: get_abs_data(category_id), ttl)
+
+
+def is_abs_url(url: str) -> bool:
+    """
+    Check whether a URL points at the ABS website (abs.gov.au or a subdomain).
+    
+    Args:
+        url (str): The URL to check
+    
+    Returns:
+        bool: True for http(s) URLs on an ABS host
+    """
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    return parsed.scheme in ("http", "https") and (host == ABS_HOST or host.endswith("." + ABS_HOST))
+
+
 def get_excel_urls_only(category_id: str) -> List[str]:
     """
     Get only the Excel file URLs for a specific category ID.
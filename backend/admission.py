@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import ipaddress
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+from fastapi import HTTPException, Request
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate tokens per second, up to capacity.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_take(self) -> float:
+        """
+        Take one token if available.
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until one is available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self) -> None:
+        """
+        Give back a token taken for a request that was not served.
+        """
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class AdmissionController:
+    """
+    Admission control in front of an expensive endpoint.
+
+    Each caller first takes a token from its own bucket (429 when empty). It
+    then needs one of max_concurrency slots; up to max_queue callers may wait
+    for a slot for at most queue_timeout seconds. Anything beyond that is
+    rejected straight away with 503, so accepted requests are not slowed down
+    by a backlog they cannot clear. A caller turned away with 503 gets its
+    token back, so server overload does not count against its rate limit.
+
+    All state lives in the process: with several uvicorn workers each worker
+    enforces these limits on its own, so the effective limits are the
+    configured values multiplied by the number of workers.
+
+    A rate_per_minute of 0 disables the per-caller rate limit.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_queue: int = 32, queue_timeout: float = 10.0,
+                 rate_per_minute: float = 30.0, burst: int = 10, max_callers: int = 10000,
+                 trusted_proxies: Optional[List[str]] = None):
+        if rate_per_minute < 0:
+            raise ValueError("rate_per_minute must not be negative")
+        if rate_per_minute > 0 and burst < 1:
+            raise ValueError("burst must be at least 1 when rate limiting is enabled")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_callers = max_callers
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._buckets = OrderedDict()
+        self._buckets_lock = threading.Lock()
+        self.trusted_proxies = [ipaddress.ip_network(proxy.strip(), strict=False)
+                                for proxy in trusted_proxies or [] if proxy.strip()]
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "AdmissionController":
+        """
+        Build a controller from <prefix>_MAX_CONCURRENCY, <prefix>_MAX_QUEUE,
+        <prefix>_QUEUE_TIMEOUT, <prefix>_RATE_PER_MINUTE, <prefix>_BURST and
+        <prefix>_TRUSTED_PROXIES (comma-separated addresses or networks).
+        """
+        return cls(
+            max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", 8)),
+            max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", 32)),
+            queue_timeout=float(os.getenv(f"{prefix}_QUEUE_TIMEOUT", 10)),
+            rate_per_minute=float(os.getenv(f"{prefix}_RATE_PER_MINUTE", 30)),
+            burst=int(os.getenv(f"{prefix}_BURST", 10)),
+            trusted_proxies=os.getenv(f"{prefix}_TRUSTED_PROXIES", "").split(","),
+        )
+
+    def _is_trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def client_address(self, request: Request) -> str:
+        """
+        Find the address of the client a request was made for.
+
+        When the request comes from a trusted proxy, X-Forwarded-For is read
+        from the right, skipping trusted proxies, so the first untrusted hop is
+        the client. Entries left of that are supplied by the client and ignored.
+
+        Args:
+            request (Request): The incoming request
+
+        Returns:
+            str: The client address, or "anonymous" if it is unknown
+        """
+        address = request.client.host if request.client else "anonymous"
+        if not self._is_trusted(address):
+            return address
+
+        forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        for hop in reversed(forwarded):
+            if not self._is_trusted(hop):
+                return hop
+        return forwarded[0] if forwarded else address
+
+    def _bucket(self, caller: str) -> TokenBucket:
+        # Callers are keyed by a digest so API keys are not kept in memory
+        key = hashlib.sha256(caller.encode()).hexdigest()
+        with self._buckets_lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[key] = bucket
+                while len(self._buckets) > self.max_callers:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket
+
+    def _reject(self, status_code: int, detail: str, retry_after: float) -> HTTPException:
+        return HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+    @asynccontextmanager
+    async def admit(self, caller: str) -> AsyncIterator[None]:
+        """
+        Hold a concurrency slot for the duration of the block.
+
+        Args:
+            caller (str): Identifies the caller for rate limiting, normally client_address(request)
+
+        Raises:
+            HTTPException: 429 if the caller is over its rate limit, 503 if the
+                queue is full or no slot frees up within queue_timeout
+        """
+        bucket = self._bucket(caller) if self.rate > 0 else None
+        wait = bucket.try_take() if bucket else 0
+        if wait:
+            raise self._reject(429, "Rate limit exceeded", wait)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                if bucket:
+                    bucket.refund()
+                raise self._reject(503, "Server is busy, try again later", self.queue_timeout)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                if bucket:
+                    bucket.refund()
+                raise self._reject(503, "Server is busy, try again later", self.queue_timeout)
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
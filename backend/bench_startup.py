@@ -0,0 +1,158 @@
+"""
+Cold-start benchmark for the backend.
+
+Measures, in fresh interpreter processes:
+  - how long `import main` takes, and whether it pulled in pandas/numpy/openpyxl
+  - how long a uvicorn worker takes from spawn to serving its first request
+
+Exits with status 1 if either median exceeds its budget or a heavy module is
+imported at startup, so it can be used as a regression check in CI:
+
+    python bench_startup.py --runs 5 --import-budget 1.0 --first-request-budget 3.0
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import List, Dict, Any
+
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that only the Excel code paths need
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl']
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'heavy': [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_import() -> Dict[str, Any]:
+    """
+    Import main in a fresh interpreter and report the time taken.
+
+    Returns:
+        Dict[str, Any]: {'seconds': float, 'heavy': list of heavy modules that were imported}
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_first_request(timeout: float = 30.0) -> float:
+    """
+    Start a uvicorn worker and time how long it takes to answer GET /api.
+
+    Args:
+        timeout (float): Give up if the server has not answered after this many seconds
+
+    Returns:
+        float: Seconds from spawning the process to the first successful response
+
+    Raises:
+        RuntimeError: If the server exits or does not answer within timeout
+    """
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/api"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with status {server.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.01)
+        raise RuntimeError(f"Server did not answer within {timeout} seconds")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def run_benchmark(runs: int) -> Dict[str, Any]:
+    """
+    Repeat both measurements and summarise them.
+
+    Args:
+        runs (int): Number of cold starts to measure
+
+    Returns:
+        Dict[str, Any]: Median and individual timings plus any heavy modules seen at import
+    """
+    import_times: List[float] = []
+    first_request_times: List[float] = []
+    heavy = set()
+
+    for _ in range(runs):
+        result = measure_import()
+        import_times.append(result['seconds'])
+        heavy.update(result['heavy'])
+        first_request_times.append(measure_first_request())
+
+    return {
+        'import_seconds': statistics.median(import_times),
+        'first_request_seconds': statistics.median(first_request_times),
+        'import_runs': import_times,
+        'first_request_runs': first_request_times,
+        'heavy_modules': sorted(heavy),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure backend cold-start time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float,
+                        default=float(os.getenv("COLD_START_IMPORT_BUDGET", 1.0)),
+                        help="Maximum median seconds for 'import main'")
+    parser.add_argument("--first-request-budget", type=float,
+                        default=float(os.getenv("COLD_START_FIRST_REQUEST_BUDGET", 3.0)),
+                        help="Maximum median seconds from process start to first response")
+    args = parser.parse_args()
+
+    summary = run_benchmark(args.runs)
+
+    print(f"import main:   {summary['import_seconds'] * 1000:.0f} ms median "
+          f"(budget {args.import_budget * 1000:.0f} ms)")
+    print(f"first request: {summary['first_request_seconds'] * 1000:.0f} ms median "
+          f"(budget {args.first_request_budget * 1000:.0f} ms)")
+
+    failures = []
+    if summary['heavy_modules']:
+        failures.append(f"heavy modules imported at startup: {', '.join(summary['heavy_modules'])}")
+    if summary['import_seconds'] > args.import_budget:
+        failures.append("import time over budget")
+    if summary['first_request_seconds'] > args.first_request_budget:
+        failures.append("time to first request over budget")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK")
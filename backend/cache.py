@@ -0,0 +1,293 @@
+import fcntl
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+DEFAULT_TTL = 3600
+DEFAULT_LOCK_TIMEOUT = 120
+DEFAULT_SQLITE_PATH = "./cache/cache.sqlite3"
+
+
+class CacheBackend(ABC):
+    """
+    Interface shared by all cache backends.
+
+    Subclasses implement get/set/delete and a per-key lock; get_or_compute uses
+    the lock so concurrent callers wait for the first one instead of repeating
+    the same expensive fetch.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return the value stored under key, or None if missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = DEFAULT_TTL) -> None:
+        """Store value under key for ttl seconds (None keeps it until evicted)."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove key if present."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every key."""
+
+    @abstractmethod
+    def lock(self, key: str, timeout: float = DEFAULT_LOCK_TIMEOUT):
+        """
+        Context manager holding an exclusive lock on key.
+
+        Yields True if the lock was acquired, or False if timeout expired first,
+        in which case the caller proceeds unlocked rather than stalling.
+        """
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any],
+                       ttl: Optional[float] = DEFAULT_TTL) -> Any:
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        Args:
+            key (str): Cache key
+            compute (Callable[[], Any]): Function producing the value on a miss
+            ttl (float, optional): Seconds to keep the value. None keeps it until evicted.
+
+        Returns:
+            Any: The cached or freshly computed value
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self.lock(key):
+            # Another worker may have filled the key while we waited for the lock
+            value = self.get(key)
+            if value is not None:
+                return value
+            value = compute()
+            if value is not None:
+                self.set(key, value, ttl)
+            return value
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process LRU cache. Fast, but private to each worker process.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._mutex = threading.Lock()
+        # key -> [lock, number of threads holding or waiting for it]; entries are
+        # dropped once nobody uses them so the table does not grow with every key
+        self._key_locks: Dict[str, list] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._mutex:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = DEFAULT_TTL) -> None:
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._mutex:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._mutex:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._mutex:
+            self._entries.clear()
+
+    @contextmanager
+    def lock(self, key: str, timeout: float = DEFAULT_LOCK_TIMEOUT) -> Iterator[bool]:
+        with self._mutex:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        key_lock = entry[0]
+        acquired = key_lock.acquire(timeout=timeout)
+        if not acquired:
+            print(f"Warning: Timed out waiting for cache lock on {key}")
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                key_lock.release()
+            with self._mutex:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache shared by every worker process on the host, stored in SQLite (WAL mode).
+
+    Values are pickled, so the database must only be written by this service.
+    Per-key locks are flock()ed lock files next to the database; the kernel
+    releases them if a worker dies while holding one, and each file is removed
+    when its lock is released.
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock_dir = path + ".locks"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "created_at REAL NOT NULL, expires_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_created_at ON cache (created_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            self.delete(key)
+            return None
+        try:
+            return pickle.loads(value)
+        except Exception as e:
+            print(f"Warning: Discarding unreadable cache entry {key}: {str(e)}")
+            self.delete(key)
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = DEFAULT_TTL) -> None:
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now, expires_at)
+        )
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            "SELECT key FROM cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM cache")
+
+    @contextmanager
+    def lock(self, key: str, timeout: float = DEFAULT_LOCK_TIMEOUT) -> Iterator[bool]:
+        lock_path = os.path.join(self.lock_dir, hashlib.sha1(key.encode()).hexdigest() + ".lock")
+        deadline = time.monotonic() + timeout
+        lock_file = None
+        while True:
+            lock_file = open(lock_path, 'a')
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                lock_file = None
+                if time.monotonic() >= deadline:
+                    print(f"Warning: Timed out waiting for cache lock on {key}")
+                    break
+                time.sleep(0.05)
+                continue
+            # The previous holder unlinks the file before unlocking; if we locked
+            # a file that has since been removed, retry on a fresh one
+            try:
+                if os.stat(lock_path).st_ino == os.fstat(lock_file.fileno()).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+            lock_file = None
+
+        try:
+            yield lock_file is not None
+        finally:
+            if lock_file is not None:
+                # Remove the lock file while still holding it so lock files do not pile up
+                try:
+                    os.unlink(lock_path)
+                except FileNotFoundError:
+                    pass
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                lock_file.close()
+
+
+_cache = None
+_cache_mutex = threading.Lock()
+
+
+def get_cache() -> CacheBackend:
+    """
+    Return the process-wide cache backend, creating it on first use.
+
+    The backend is chosen with the CACHE_BACKEND environment variable:
+    'sqlite' (default) shares entries between workers via CACHE_PATH, and
+    'memory' keeps a private LRU in each process.
+
+    Returns:
+        CacheBackend: The configured cache backend
+    """
+    global _cache
+    with _cache_mutex:
+        if _cache is None:
+            backend = os.getenv("CACHE_BACKEND", "sqlite").lower()
+            if backend == "memory":
+                _cache = MemoryCache()
+            elif backend == "sqlite":
+                _cache = SQLiteCache(os.getenv("CACHE_PATH", DEFAULT_SQLITE_PATH))
+            else:
+                raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+        return _cache
+
+
+def set_cache(cache: CacheBackend) -> None:
+    """
+    Replace the process-wide cache backend.
+
+    Args:
+        cache (CacheBackend): Backend to use for subsequent get_cache() calls
+    """
+    global _cache
+    with _cache_mutex:
+        _cache = cache
@@ -0,0 +1,115 @@
+import numpy as np
+
+
+METHODS = ('lttb', 'minmax')
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Pick points to keep with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. The rest of the series is split
+    into points - 2 buckets, and from each bucket the point forming the largest
+    triangle with the previously kept point and the next bucket's average is
+    kept. Bucket averages and triangle areas are computed with numpy over whole
+    buckets; only the walk from bucket to bucket is a Python loop.
+
+    Args:
+        x (np.ndarray): Monotonic x values (e.g. timestamps)
+        y (np.ndarray): Values, without NaNs
+        points (int): Number of points to keep
+
+    Returns:
+        np.ndarray: Sorted indices of the points to keep
+    """
+    n = len(x)
+    if points >= n:
+        return np.arange(n)
+    if points < 3:
+        return np.array([0, n - 1][:max(points, 0)], dtype=np.int64)
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+
+    # Bucket i covers [edges[i], edges[i + 1]); the final "bucket" is just the last point
+    every = (n - 2) / (points - 2)
+    edges = np.append((np.arange(points - 1) * every).astype(np.int64) + 1, n)
+    edges[-2] = n - 1
+
+    sum_x = np.concatenate(([0.0], np.cumsum(x)))
+    sum_y = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = edges[1:] - edges[:-1]
+    avg_x = (sum_x[edges[1:]] - sum_x[edges[:-1]]) / sizes
+    avg_y = (sum_y[edges[1:]] - sum_y[edges[:-1]]) / sizes
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_x, next_y = avg_x[i + 1], avg_y[i + 1]
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_indices(y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Keep the minimum and maximum of each bucket, plus the first and last points.
+
+    (points - 2) // 2 buckets are used, so at most points indices are returned;
+    with points == 3 the only point kept between the ends is the maximum.
+    Fully vectorised: points are sorted by (bucket, value) once, so each
+    bucket's minimum and maximum are its first and last entries.
+
+    Args:
+        y (np.ndarray): Values, without NaNs
+        points (int): Maximum number of points to keep
+
+    Returns:
+        np.ndarray: Sorted indices of the points to keep
+    """
+    n = len(y)
+    if points >= n:
+        return np.arange(n)
+    if points < 3:
+        return np.array([0, n - 1][:max(points, 0)], dtype=np.int64)
+
+    # Two points per bucket plus the first and last, never more than points
+    buckets = (points - 2) // 2
+    if buckets == 0:
+        return np.unique([0, int(np.argmax(y)), n - 1])
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    bucket_ids = np.repeat(np.arange(buckets), np.diff(edges))
+    order = np.lexsort((y, bucket_ids))
+    keep = np.concatenate((order[edges[:-1]], order[edges[1:] - 1], [0, n - 1]))
+    return np.unique(keep)
+
+
+def downsample(x: np.ndarray, y: np.ndarray, points: int = 200, method: str = 'lttb') -> np.ndarray:
+    """
+    Choose which points of a series to send to a chart.
+
+    Args:
+        x (np.ndarray): Monotonic x values (e.g. timestamps)
+        y (np.ndarray): Values, without NaNs
+        points (int): Target number of points
+        method (str): 'lttb' (Largest-Triangle-Three-Buckets) or 'minmax' (bucket extremes)
+
+    Returns:
+        np.ndarray: Sorted indices of the points to keep
+
+    Raises:
+        ValueError: If method is not supported
+    """
+    if method == 'lttb':
+        return lttb_indices(x, y, points)
+    if method == 'minmax':
+        return minmax_indices(y, points)
+    raise ValueError(f"Unsupported downsampling method: {method}. Use one of {', '.join(METHODS)}")
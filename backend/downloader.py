@@ -0,0 +1,393 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Optional
+from urllib.parse import urljoin
+
+import requests
+
+from cache import get_cache
+
+
+DEFAULT_TIMEOUT = (10, 60)  # (connect, read) seconds
+DEFAULT_PARTS = 4
+MIN_PART_SIZE = 4 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+# Network reads are smaller than the write buffer so a dropped connection
+# loses at most one read's worth of progress
+READ_SIZE = 64 * 1024
+MAX_RETRIES = 3
+STATE_SAVE_INTERVAL = 8 * 1024 * 1024
+DOWNLOAD_LOCK_TIMEOUT = 600
+MAX_REDIRECTS = 5
+ZIP_EXTENSIONS = ('.xlsx', '.xlsm', '.zip')
+
+HEADERS = {'User-Agent': 'GovHack-Backend/1.0'}
+
+
+class RangeNotSupported(Exception):
+    """Raised when a server answers a ranged request with the whole file."""
+
+
+class DownloadTooLarge(ValueError):
+    """Raised when a remote file is bigger than the caller allows."""
+
+
+def _check_response(response: requests.Response) -> None:
+    # Redirects are resolved once by probe_url; data requests must not follow new ones
+    if response.is_redirect:
+        response.close()
+        raise requests.HTTPError(f"Unexpected redirect from {response.url}", response=response)
+    response.raise_for_status()
+
+
+def probe_url(url: str, timeout=DEFAULT_TIMEOUT,
+              allow_url: Optional[Callable[[str], bool]] = None) -> Dict[str, Any]:
+    """
+    Find out the size of a remote file and whether it can be fetched in ranges.
+
+    Redirects are followed here, one hop at a time, and every hop is checked
+    with allow_url. download_file then fetches the resolved URL directly.
+
+    Args:
+        url (str): The URL to probe
+        timeout: Requests timeout, as seconds or a (connect, read) tuple
+        allow_url (Callable[[str], bool], optional): Returns False for URLs that must not be requested
+
+    Returns:
+        Dict[str, Any]: Dictionary containing 'url' (after redirects), 'size' (int or None),
+            'accept_ranges', 'etag', 'content_type' and 'content_md5' (from the response headers)
+
+    Raises:
+        requests.RequestException: If the server cannot be reached
+        ValueError: If allow_url rejects the URL or a redirect target
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        if allow_url is not None and not allow_url(url):
+            raise ValueError(f"URL not allowed: {url}")
+        response = requests.head(url, headers=HEADERS, timeout=timeout, allow_redirects=False)
+        if not response.is_redirect:
+            break
+        url = urljoin(url, response.headers['Location'])
+    else:
+        raise requests.TooManyRedirects(f"More than {MAX_REDIRECTS} redirects")
+
+    if response.status_code >= 400:
+        # Some servers reject HEAD; a one-byte ranged GET gives the same information
+        response = requests.get(url, headers={**HEADERS, 'Range': 'bytes=0-0'},
+                                timeout=timeout, stream=True, allow_redirects=False)
+        response.close()
+        _check_response(response)
+
+    headers = response.headers
+    size = None
+    if response.status_code == 206 and '/' in headers.get('Content-Range', ''):
+        total = headers['Content-Range'].rsplit('/', 1)[1]
+        size = int(total) if total.isdigit() else None
+    elif headers.get('Content-Length', '').isdigit():
+        size = int(headers['Content-Length'])
+
+    return {
+        'url': url,
+        'size': size,
+        'accept_ranges': response.status_code == 206 or headers.get('Accept-Ranges', '').lower() == 'bytes',
+        'etag': headers.get('ETag'),
+        'content_type': headers.get('Content-Type', '').lower(),
+        'content_md5': headers.get('Content-MD5'),
+    }
+
+
+def _split_ranges(size: int, parts: int) -> List[List[int]]:
+    # Each range is [start, end (inclusive), bytes written so far]
+    parts = max(1, min(parts, size // MIN_PART_SIZE))
+    part_size = -(-size // parts)
+    return [[start, min(start + part_size, size) - 1, 0] for start in range(0, size, part_size)]
+
+
+def _load_state(state_path: str, url: str, info: Dict[str, Any], mode: str) -> Optional[Dict[str, Any]]:
+    # mode is 'ranged' or 'stream'; a .part written one way cannot be resumed the other way
+    if not os.path.exists(state_path):
+        return None
+    try:
+        with open(state_path, "r") as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    # Only resume if the remote file is the same one we started downloading
+    if state.get('url') != url or state.get('size') != info['size'] or state.get('etag') != info['etag']:
+        return None
+    if state.get('mode') != mode or (mode == 'ranged' and not isinstance(state.get('ranges'), list)):
+        return None
+    return state
+
+
+def _save_state(state_path: str, state: Dict[str, Any]) -> None:
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def _fetch_range(url: str, part_path: str, byte_range: List[int], state: Dict[str, Any],
+                 state_path: str, state_lock: threading.Lock, timeout) -> None:
+    start, end, _ = byte_range
+    attempt = 0
+    while byte_range[2] < end - start + 1:
+        offset = start + byte_range[2]
+        try:
+            response = requests.get(url, headers={**HEADERS, 'Range': f"bytes={offset}-{end}"},
+                                    stream=True, timeout=timeout, allow_redirects=False)
+            _check_response(response)
+            if response.status_code != 206:
+                response.close()
+                raise RangeNotSupported(f"Server ignored range request for {url}")
+
+            # byte_range[2] only counts bytes flushed out of this range's own
+            # buffer; other threads save the shared state at any time, and
+            # must never record bytes that are not in the file yet
+            buffered = 0
+            with response, open(part_path, 'r+b', buffering=CHUNK_SIZE) as f:
+                f.seek(offset)
+                try:
+                    for chunk in response.iter_content(chunk_size=READ_SIZE):
+                        if byte_range[2] + buffered + len(chunk) > end - start + 1:
+                            raise ValueError(f"Server sent more than the requested range {offset}-{end}")
+                        f.write(chunk)
+                        buffered += len(chunk)
+                        if buffered >= STATE_SAVE_INTERVAL:
+                            f.flush()
+                            byte_range[2] += buffered
+                            buffered = 0
+                            with state_lock:
+                                _save_state(state_path, state)
+                finally:
+                    f.flush()
+                    byte_range[2] += buffered
+        except RangeNotSupported:
+            raise
+        except requests.RequestException as e:
+            attempt += 1
+            if attempt > MAX_RETRIES:
+                raise
+            print(f"Warning: Range {offset}-{end} of {url} failed ({str(e)}), retrying")
+            time.sleep(2 ** attempt)
+        finally:
+            with state_lock:
+                _save_state(state_path, state)
+
+
+def _fetch_stream(url: str, part_path: str, resume: bool, timeout, max_bytes: Optional[int] = None) -> None:
+    attempt = 0
+    while True:
+        offset = os.path.getsize(part_path) if resume and os.path.exists(part_path) else 0
+        headers = dict(HEADERS)
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+        try:
+            response = requests.get(url, headers=headers, stream=True, timeout=timeout, allow_redirects=False)
+            if offset and response.status_code == 416:
+                # Nothing left to fetch
+                response.close()
+                return
+            _check_response(response)
+            if offset and response.status_code != 206:
+                offset = 0
+            written = offset
+            with response, open(part_path, 'ab' if offset else 'wb', buffering=CHUNK_SIZE) as f:
+                for chunk in response.iter_content(chunk_size=READ_SIZE):
+                    written += len(chunk)
+                    # The size may be unknown up front, so the limit is enforced as data arrives
+                    if max_bytes is not None and written > max_bytes:
+                        raise DownloadTooLarge(f"{url} is larger than {max_bytes} bytes")
+                    f.write(chunk)
+            return
+        except requests.RequestException as e:
+            attempt += 1
+            if attempt > MAX_RETRIES:
+                raise
+            print(f"Warning: Download of {url} interrupted ({str(e)}), retrying")
+            time.sleep(2 ** attempt)
+
+
+def file_sha256(file_path: str) -> str:
+    """
+    Compute the SHA-256 checksum of a file.
+
+    Args:
+        file_path (str): Path to the file
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _verify(part_path: str, save_path: str, info: Dict[str, Any], expected_sha256: Optional[str],
+            state: Optional[Dict[str, Any]] = None) -> str:
+    # The ranged path pre-allocates the .part file, so its size proves nothing;
+    # check that every range was actually written instead
+    if state is not None and 'ranges' in state:
+        written = sum(r[2] for r in state['ranges'])
+        if written != info['size']:
+            raise ValueError(f"Downloaded {written} bytes, expected {info['size']}")
+
+    actual_size = os.path.getsize(part_path)
+    if info['size'] is not None and actual_size != info['size']:
+        raise ValueError(f"Downloaded size {actual_size} does not match expected {info['size']}")
+
+    # xlsx files are zip packages; checking every member's CRC catches corrupt data
+    if save_path.lower().endswith(ZIP_EXTENSIONS):
+        try:
+            with zipfile.ZipFile(part_path) as archive:
+                bad_member = archive.testzip()
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"Downloaded file is not a valid zip package: {str(e)}")
+        if bad_member is not None:
+            raise ValueError(f"CRC check failed for {bad_member} in downloaded file")
+
+    sha256 = file_sha256(part_path)
+    if expected_sha256 and sha256 != expected_sha256.lower():
+        raise ValueError(f"SHA-256 mismatch: expected {expected_sha256}, got {sha256}")
+
+    if info.get('content_md5'):
+        md5 = hashlib.md5()
+        with open(part_path, 'rb') as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+                md5.update(block)
+        if base64.b64encode(md5.digest()).decode() != info['content_md5']:
+            raise ValueError("Content-MD5 mismatch")
+
+    return sha256
+
+
+def download_file(url: str, save_path: str, parts: int = DEFAULT_PARTS,
+                  expected_sha256: Optional[str] = None, timeout=DEFAULT_TIMEOUT,
+                  info: Optional[Dict[str, Any]] = None, max_bytes: Optional[int] = None,
+                  allow_url: Optional[Callable[[str], bool]] = None) -> Dict[str, Any]:
+    """
+    Download a file with ranged, resumable transfers and move it into place atomically.
+
+    Data is written to '<save_path>.part', with progress recorded in
+    '<save_path>.part.json'. If a previous attempt was interrupted and the
+    remote file is unchanged (same size and ETag), the transfer resumes from
+    the last written offset. Large files on servers that accept byte ranges
+    are fetched as several parallel ranges. The file only appears at
+    save_path once every byte has been accounted for and, for xlsx/zip
+    files, every member's CRC checks out.
+
+    Callers downloading to the same save_path are serialised with a lock from
+    the shared cache backend, so two workers never write the same .part file.
+
+    Args:
+        url (str): The URL to download
+        save_path (str): Final path of the file
+        parts (int): Maximum number of parallel ranges for large files
+        expected_sha256 (str, optional): Checksum the downloaded file must match
+        timeout: Requests timeout, as seconds or a (connect, read) tuple
+        info (Dict[str, Any], optional): Result of probe_url, if already known
+        max_bytes (int, optional): Refuse files larger than this many bytes
+        allow_url (Callable[[str], bool], optional): Passed to probe_url to vet the URL and its redirects
+
+    Returns:
+        Dict[str, Any]: Dictionary containing 'path', 'size', 'sha256',
+            'content_type' and 'parts' (number of ranges used)
+
+    Raises:
+        requests.RequestException: If the download fails after retries
+        ValueError: If the downloaded file fails verification or the URL is not allowed
+        DownloadTooLarge: If the file is larger than max_bytes
+        TimeoutError: If another download to save_path does not finish in time
+    """
+    if info is None:
+        info = probe_url(url, timeout, allow_url=allow_url)
+    if max_bytes is not None and info['size'] is not None and info['size'] > max_bytes:
+        raise DownloadTooLarge(f"{url} is {info['size']} bytes, more than the limit of {max_bytes}")
+
+    # Only one caller (thread or worker process) may own a .part file at a time
+    with get_cache().lock(f"download:{os.path.abspath(save_path)}", timeout=DOWNLOAD_LOCK_TIMEOUT) as acquired:
+        if not acquired:
+            raise TimeoutError(f"Timed out waiting for another download of {save_path}")
+        return _download_locked(url, save_path, parts, expected_sha256, timeout, info, max_bytes)
+
+
+def _download_locked(url: str, save_path: str, parts: int, expected_sha256: Optional[str],
+                     timeout, info: Dict[str, Any], max_bytes: Optional[int]) -> Dict[str, Any]:
+    # Resume state is keyed on the URL we were asked for; data comes from where it redirected
+    fetch_url = info.get('url', url)
+    directory = os.path.dirname(os.path.abspath(save_path))
+    os.makedirs(directory, exist_ok=True)
+    part_path = save_path + ".part"
+    state_path = part_path + ".json"
+
+    ranged = info['accept_ranges'] and info['size'] is not None
+    used_parts = 1
+    state = None
+
+    if ranged and info['size'] > 0:
+        state = _load_state(state_path, url, info, 'ranged')
+        if state is None or not os.path.exists(part_path):
+            state = {'url': url, 'size': info['size'], 'etag': info['etag'], 'mode': 'ranged',
+                     'ranges': _split_ranges(info['size'], parts)}
+            with open(part_path, 'wb') as f:
+                f.truncate(info['size'])
+            _save_state(state_path, state)
+        else:
+            done = sum(r[2] for r in state['ranges'])
+            print(f"Resuming download of {url} at {done}/{info['size']} bytes")
+
+        used_parts = len(state['ranges'])
+        state_lock = threading.Lock()
+        try:
+            with ThreadPoolExecutor(max_workers=used_parts) as executor:
+                futures = [
+                    executor.submit(_fetch_range, fetch_url, part_path, byte_range, state,
+                                    state_path, state_lock, timeout)
+                    for byte_range in state['ranges']
+                ]
+                for future in futures:
+                    future.result()
+        except RangeNotSupported:
+            print(f"Warning: {url} does not honour range requests, downloading in one stream")
+            ranged = False
+            used_parts = 1
+            state = None
+            for path in (part_path, state_path):
+                if os.path.exists(path):
+                    os.unlink(path)
+
+    if not ranged or info['size'] == 0:
+        # Append to an existing partial file only if it belongs to the same remote file
+        resume = (info['accept_ranges'] and os.path.exists(part_path)
+                  and _load_state(state_path, url, info, 'stream') is not None)
+        _save_state(state_path, {'url': url, 'size': info['size'], 'etag': info['etag'], 'mode': 'stream'})
+        _fetch_stream(fetch_url, part_path, resume=resume, timeout=timeout, max_bytes=max_bytes)
+
+    try:
+        sha256 = _verify(part_path, save_path, info, expected_sha256, state)
+    except ValueError:
+        # A corrupt partial file must not be resumed
+        for path in (part_path, state_path):
+            if os.path.exists(path):
+                os.unlink(path)
+        raise
+
+    os.replace(part_path, save_path)
+    if os.path.exists(state_path):
+        os.unlink(state_path)
+
+    return {
+        'path': save_path,
+        'size': os.path.getsize(save_path),
+        'sha256': sha256,
+        'content_type': info['content_type'],
+        'parts': used_parts,
+    }
@@ -1,21 +1,33 @@
 import json
 import os
 import requests
-import pandas as pd
-from typing import Optional, Dict, Any, List
+from typing import Callable, Optional, Dict, Any, List
 from urllib.parse import urlparse
 import tempfile
 from pathlib import Path
 import hashlib
+from cache import get_cache, DEFAULT_TTL
+from downloader import probe_url, download_file
+from workbook_inspector import inspect_workbook, is_xlsx_file
 
+# pandas (and through it numpy and openpyxl) is imported inside the functions
+# that read cell data, so importing this module stays cheap for code paths
+# that never touch a workbook.
 
-def download_excel_file(url: str, save_path: Optional[str] = None) -> str:
+
+def download_excel_file(url: str, save_path: Optional[str] = None, max_bytes: Optional[int] = None,
+                        allow_url: Optional[Callable[[str], bool]] = None) -> str:
     """
     Download an Excel file from a URL and save it locally.
     
+    Interrupted downloads are resumed on the next call for the same save_path,
+    and a truncated file is never left at save_path.
+    
     Args:
         url (str): The URL of the Excel file to download
         save_path (str, optional): Local path to save the file. If None, saves to ./files directory with a generated filename.
+        max_bytes (int, optional): Refuse files larger than this many bytes
+        allow_url (Callable[[str], bool], optional): Returns False for URLs (including redirect targets) that must not be fetched
     
     Returns:
         str: The path to the downloaded file
@@ -30,12 +42,11 @@ def download_excel_file(url: str, save_path: Optional[str] = None) -> str:
         if not parsed_url.scheme or not parsed_url.netloc:
             raise ValueError("Invalid URL provided")
         
-        # Make request to download the file
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
+        # Probe size, range support and content type before downloading
+        info = probe_url(url, allow_url=allow_url)
         
         # Check if content type indicates Excel file
-        content_type = response.headers.get('content-type', '').lower()
+        content_type = info['content_type']
         if not any(excel_type in content_type for excel_type in ['excel', 'spreadsheet', 'vnd.ms-excel', 'vnd.openxmlformats']):
             # Check file extension as fallback
             file_extension = Path(parsed_url.path).suffix.lower()
@@ -54,15 +65,11 @@ def download_excel_file(url: str, save_path: Optional[str] = None) -> str:
             filename = f"excel_{url_hash}{file_extension}"
             save_path = os.path.join(files_dir, filename)
         
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        # Download to a temporary file (in parallel ranges and resuming where
+        # possible) and only move it to save_path once size and checksum check out
+        result = download_file(url, save_path, info=info, max_bytes=max_bytes)
         
-        # Download and save the file
-        with open(save_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        print(f"Successfully downloaded Excel file to: {save_path}")
+        print(f"Successfully downloaded Excel file to: {save_path} ({result['size']} bytes, {result['parts']} parts)")
         return save_path
         
     except requests.RequestException as e:
@@ -71,6 +78,56 @@ def download_excel_file(url: str, save_path: Optional[str] = None) -> str:
         raise Exception(f"Error downloading Excel file: {str(e)}")
 
 
+def plan_excel_read(file_path: str, sheet_name: Optional[str] = None, header_row: int = 0,
+                    max_rows: Optional[int] = None, max_columns: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Work out pd.read_excel arguments from the workbook's sheet list and dimensions.
+    
+    For xlsx files the sheet sizes are probed with inspect_workbook, so the read
+    can be limited to the rows and columns that will actually be used. Other
+    formats fall back to the unrestricted read.
+    
+    Args:
+        file_path (str): Path to the Excel file
+        sheet_name (str, optional): Name of the sheet to read. If None, the first sheet is used.
+        header_row (int): Row number to use as column headers (0-indexed)
+        max_rows (int, optional): Maximum number of data rows to read
+        max_columns (int, optional): Maximum number of columns to read
+    
+    Returns:
+        Dict[str, Any]: Keyword arguments for pd.read_excel ('sheet_name', 'header',
+            'nrows' and, when the column count is known, 'usecols'), plus
+            'total_rows' and 'total_columns' for the whole sheet when known
+    """
+    plan = {'sheet_name': sheet_name or 0, 'header': header_row, 'nrows': max_rows,
+            'total_rows': None, 'total_columns': None}
+    if not is_xlsx_file(file_path):
+        return plan
+    
+    try:
+        info = inspect_workbook(file_path, header_rows=0)
+    except Exception as e:
+        print(f"Warning: Could not inspect {file_path}, reading without a plan: {str(e)}")
+        return plan
+    
+    sheets = info['sheets']
+    if sheet_name:
+        sheet = next((s for s in sheets if s['name'] == sheet_name), None)
+    else:
+        sheet = sheets[0] if sheets else None
+    if sheet is None or sheet['rows'] is None:
+        return plan
+    
+    plan['sheet_name'] = sheet['name']
+    plan['total_rows'] = max(sheet['rows'] - header_row - 1, 0)
+    plan['total_columns'] = sheet['columns']
+    # Only restrict columns when the count is known; pandas rejects out-of-range usecols
+    if max_columns and sheet['columns'] > max_columns:
+        plan['usecols'] = list(range(max_columns))
+    
+    return plan
+
+
 def read_excel_data(file_path: str, sheet_name: Optional[str] = None, 
                    header_row: int = 0, max_rows: Optional[int] = None) -> Dict[str, Any]:
     """
@@ -99,11 +156,11 @@ def read_excel_data(file_path: str, sheet_name: Optional[str] = None,
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        # Read Excel file
-        if sheet_name:
-            df = pd.read_excel(file_path, sheet_name=sheet_name, header=header_row, nrows=max_rows)
-        else:
-            df = pd.read_excel(file_path, header=header_row, nrows=max_rows)
+        import pandas as pd
+        
+        # Read Excel file, limited to the planned sheet and rows
+        plan = plan_excel_read(file_path, sheet_name, header_row, max_rows)
+        df = pd.read_excel(file_path, sheet_name=plan['sheet_name'], header=plan['header'], nrows=plan['nrows'])
         
         # Convert to list of dictionaries
         data = df.to_dict('records')
@@ -118,7 +175,7 @@ def read_excel_data(file_path: str, sheet_name: Optional[str] = None,
             'data': data,
             'columns': list(df.columns),
             'shape': df.shape,
-            'sheet_name': sheet_name or 'Sheet1',
+            'sheet_name': sheet_name or (plan['sheet_name'] if isinstance(plan['sheet_name'], str) else 'Sheet1'),
             'file_path': file_path
         }
         
@@ -152,8 +209,13 @@ def get_excel_sheet_names(file_path: str) -> List[str]:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        excel_file = pd.ExcelFile(file_path)
-        sheet_names = excel_file.sheet_names
+        # xlsx sheet names come straight from workbook.xml without parsing any cells
+        if is_xlsx_file(file_path):
+            sheet_names = inspect_workbook(file_path, header_rows=0)['sheet_names']
+        else:
+            import pandas as pd
+            excel_file = pd.ExcelFile(file_path)
+            sheet_names = excel_file.sheet_names
         
         print(f"Found {len(sheet_names)} sheets in {file_path}: {sheet_names}")
         return sheet_names
@@ -302,18 +364,19 @@ def excel_to_ai_context(file_path: str, sheet_name: Optional[str] = None,
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        # Read Excel file
-        if sheet_name:
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
-        else:
-            df = pd.read_excel(file_path)
+        import pandas as pd
+        
+        # Read only the rows and columns that will be kept when the sheet size is known
+        plan = plan_excel_read(file_path, sheet_name, max_rows=max_rows, max_columns=max_columns)
+        read_args = {key: plan[key] for key in ('sheet_name', 'header', 'nrows', 'usecols') if key in plan}
+        df = pd.read_excel(file_path, **read_args)
         
         # Limit rows and columns if specified
-        if max_rows and len(df) > max_rows:
+        if max_rows and (plan['total_rows'] or len(df)) > max_rows:
             df = df.head(max_rows)
             print(f"Limited to first {max_rows} rows")
         
-        if max_columns and len(df.columns) > max_columns:
+        if max_columns and (plan['total_columns'] or len(df.columns)) > max_columns:
             df = df.iloc[:, :max_columns]
             print(f"Limited to first {max_columns} columns")
         
@@ -328,7 +391,7 @@ def excel_to_ai_context(file_path: str, sheet_name: Optional[str] = None,
         context_data = {
             "file_info": {
                 "file_path": file_path,
-                "sheet_name": sheet_name or "Sheet1",
+                "sheet_name": sheet_name or (plan['sheet_name'] if isinstance(plan['sheet_name'], str) else "Sheet1"),
                 "total_rows": len(df),
                 "total_columns": len(df.columns),
                 "columns": list(df.columns)
@@ -398,3 +461,277 @@ def excel_to_ai_context_from_url(url: str, sheet_name: Optional[str] = None,
             except:
                 pass
         raise Exception(f"Error converting Excel from URL to AI context: {str(e)}")
+
+
+# ABS time series workbooks keep series metadata in labelled rows above the
+# data, ending with a 'Series ID' row; this is how far down to look for it.
+ABS_HEADER_SCAN_ROWS = 20
+
+
+def find_abs_series_sheets(file_path: str) -> List[Dict[str, Any]]:
+    """
+    Locate every ABS time series sheet in a workbook from its header rows.
+    
+    ABS workbooks start with an 'Index' sheet; the data lives in sheets such as
+    'Data1' whose column A has labelled metadata rows ending in 'Series ID'.
+    
+    Args:
+        file_path (str): Path to the Excel file
+    
+    Returns:
+        List[Dict[str, Any]]: One entry per data sheet with 'sheet_name', 'series_id_row'
+            (0-indexed) and 'series', a list of {'column' (0-indexed), 'series_id',
+            'description', 'unit'}
+    """
+    if is_xlsx_file(file_path):
+        sheets = [
+            (sheet['name'], sheet['header'])
+            for sheet in inspect_workbook(file_path, header_rows=ABS_HEADER_SCAN_ROWS)['sheets']
+        ]
+    else:
+        import pandas as pd
+        frames = pd.read_excel(file_path, sheet_name=None, header=None, nrows=ABS_HEADER_SCAN_ROWS)
+        sheets = [
+            (name, df.astype(object).where(pd.notnull(df), None).values.tolist())
+            for name, df in frames.items()
+        ]
+    
+    layouts = []
+    for name, rows in sheets:
+        labels = [str(row[0]).strip() if row and row[0] is not None else None for row in rows]
+        if 'Series ID' not in labels:
+            continue
+        
+        id_row = labels.index('Series ID')
+        unit_row = labels.index('Unit') if 'Unit' in labels else None
+        
+        def cell(row_index, column):
+            if row_index is None or column >= len(rows[row_index]):
+                return None
+            return rows[row_index][column]
+        
+        series = [
+            {
+                'column': column,
+                'series_id': str(series_id).strip(),
+                'description': cell(0, column),
+                'unit': cell(unit_row, column),
+            }
+            for column, series_id in enumerate(rows[id_row])
+            if column > 0 and series_id is not None
+        ]
+        layouts.append({'sheet_name': name, 'series_id_row': id_row, 'series': series})
+    
+    return layouts
+
+
+def _abs_series_columns(file_path: str, sheet_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Locate the series columns of one ABS time series sheet.
+    
+    Args:
+        file_path (str): Path to the Excel file
+        sheet_name (str, optional): Sheet to use. If None, the first sheet with a 'Series ID' row.
+    
+    Returns:
+        Dict[str, Any]: One entry from find_abs_series_sheets
+    
+    Raises:
+        ValueError: If no ABS series sheet is found
+    """
+    for layout in find_abs_series_sheets(file_path):
+        if not sheet_name or layout['sheet_name'] == sheet_name:
+            return layout
+    
+    raise ValueError(f"No ABS time series sheet found in {file_path}" +
+                     (f" (sheet '{sheet_name}')" if sheet_name else ""))
+
+
+def read_abs_series(file_path: str, series_ids: Optional[List[str]] = None,
+                    sheet_name: Optional[str] = None, max_series: int = 10) -> Dict[str, Any]:
+    """
+    Read ABS time series from an Excel file as numeric arrays.
+    
+    Only the date column and the requested series columns are read. Rows without
+    a date are dropped, and each series keeps only the points that have a value.
+    
+    Args:
+        file_path (str): Path to the Excel file
+        series_ids (List[str], optional): Series IDs to include. If None, the first max_series series.
+        sheet_name (str, optional): Sheet to read. If None, the first sheet with a 'Series ID' row.
+        max_series (int): Maximum number of series to include when series_ids is None
+    
+    Returns:
+        Dict[str, Any]: Dictionary containing 'sheet_name' and 'series', a list of
+            dictionaries with 'series_id', 'description', 'unit' and parallel numpy
+            arrays 'timestamps' (Unix epoch milliseconds) and 'values'
+    
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the sheet or requested series cannot be found
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+    
+    import numpy as np
+    import pandas as pd
+    
+    layout = _abs_series_columns(file_path, sheet_name)
+    
+    if series_ids:
+        by_id = {series['series_id']: series for series in layout['series']}
+        missing = [series_id for series_id in series_ids if series_id not in by_id]
+        if missing:
+            raise ValueError(f"Series not found in {layout['sheet_name']}: {', '.join(missing)}")
+        selected = [by_id[series_id] for series_id in series_ids]
+    else:
+        selected = layout['series'][:max_series]
+    
+    # Read the date column and the selected series columns only
+    columns = [series['column'] for series in selected]
+    df = pd.read_excel(file_path, sheet_name=layout['sheet_name'], header=None,
+                       skiprows=layout['series_id_row'] + 1, usecols=[0] + columns)
+    
+    dates = pd.to_datetime(df[0], errors='coerce')
+    df = df[dates.notna()]
+    timestamps = dates[dates.notna()].values.astype('datetime64[ms]').astype(np.int64)
+    values = df[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    
+    series_data = []
+    for position, series in enumerate(selected):
+        column_values = values[:, position]
+        present = ~np.isnan(column_values)
+        series_data.append({
+            'series_id': series['series_id'],
+            'description': series['description'],
+            'unit': series['unit'],
+            'timestamps': timestamps[present],
+            'values': column_values[present],
+        })
+    
+    return {'sheet_name': layout['sheet_name'], 'series': series_data}
+
+
+def _downsample_series(parsed: Dict[str, Any], points: int, method: str) -> List[Dict[str, Any]]:
+    from chart_data import downsample, METHODS
+    
+    if method not in METHODS:
+        raise ValueError(f"Unsupported downsampling method: {method}. Use one of {', '.join(METHODS)}")
+    
+    series_data = []
+    for series in parsed['series']:
+        x, y = series['timestamps'], series['values']
+        keep = downsample(x, y, points, method)
+        series_data.append({
+            'series_id': series['series_id'],
+            'description': series['description'],
+            'unit': series['unit'],
+            'total_points': len(x),
+            'timestamps': x[keep].tolist(),
+            'values': y[keep].tolist(),
+        })
+    return series_data
+
+
+def excel_to_chart_data(file_path: str, series_ids: Optional[List[str]] = None,
+                        sheet_name: Optional[str] = None, points: int = 200,
+                        method: str = 'lttb', max_series: int = 10) -> Dict[str, Any]:
+    """
+    Convert ABS time series from an Excel file into downsampled chart data.
+    
+    Only the date column and the requested series columns are read. Each series
+    is reduced to at most `points` points, so the payload size does not grow
+    with the length of the series.
+    
+    Args:
+        file_path (str): Path to the Excel file
+        series_ids (List[str], optional): Series IDs to include. If None, the first max_series series.
+        sheet_name (str, optional): Sheet to read. If None, the first sheet with a 'Series ID' row.
+        points (int): Maximum number of points per series
+        method (str): 'lttb' (Largest-Triangle-Three-Buckets) or 'minmax' (bucket extremes)
+        max_series (int): Maximum number of series to include when series_ids is None
+    
+    Returns:
+        Dict[str, Any]: Dictionary containing:
+            - 'file_path': Path to the file
+            - 'sheet_name': Name of the sheet read
+            - 'method': Downsampling method used
+            - 'series': List of dictionaries with 'series_id', 'description', 'unit',
+              'total_points' and parallel 'timestamps' (Unix epoch milliseconds)
+              and 'values' arrays
+    
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the sheet or requested series cannot be found, or method is invalid
+        Exception: For other reading errors
+    """
+    try:
+        parsed = read_abs_series(file_path, series_ids, sheet_name, max_series)
+        series_data = _downsample_series(parsed, points, method)
+        
+        print(f"Converted {len(series_data)} series from {file_path} to chart data ({method}, {points} points)")
+        
+        return {
+            'file_path': file_path,
+            'sheet_name': parsed['sheet_name'],
+            'method': method,
+            'series': series_data,
+        }
+        
+    except (FileNotFoundError, ValueError):
+        raise
+    except Exception as e:
+        raise Exception(f"Error converting Excel to chart data: {str(e)}")
+
+
+def excel_to_chart_data_from_url_cached(url: str, series_ids: Optional[List[str]] = None,
+                                        sheet_name: Optional[str] = None, points: int = 200,
+                                        method: str = 'lttb', max_series: int = 10,
+                                        ttl: Optional[float] = DEFAULT_TTL, max_bytes: Optional[int] = None,
+                                        allow_url: Optional[Callable[[str], bool]] = None) -> Dict[str, Any]:
+    """
+    Download an Excel file and convert it to chart data, reusing a cached parse for the URL.
+    
+    The parsed series are stored in the shared cache backend, so every worker on
+    the host downloads and parses a workbook once; requests that only differ in
+    points or method just downsample the cached arrays again.
+    
+    The workbook is downloaded into a private temporary directory that is
+    removed afterwards, so concurrent requests never share a file and files
+    kept in ./files by the refresh job are left alone.
+    
+    Args:
+        url (str): URL of the Excel file to download
+        series_ids (List[str], optional): Series IDs to include
+        sheet_name (str, optional): Sheet to read
+        points (int): Maximum number of points per series
+        method (str): 'lttb' or 'minmax'
+        max_series (int): Maximum number of series to include when series_ids is None
+        ttl (float, optional): Seconds to keep the cached parse
+        max_bytes (int, optional): Refuse workbooks larger than this many bytes
+        allow_url (Callable[[str], bool], optional): Returns False for URLs (including redirect targets) that must not be fetched
+    
+    Returns:
+        Dict[str, Any]: Same structure as excel_to_chart_data, plus 'source_url'
+        
+    Raises:
+        requests.RequestException: If the download fails
+        Exception: For other errors
+    """
+    def compute():
+        file_extension = Path(urlparse(url).path).suffix or '.xlsx'
+        with tempfile.TemporaryDirectory(prefix="chart_") as temp_dir:
+            file_path = download_excel_file(url, os.path.join(temp_dir, f"workbook{file_extension}"),
+                                            max_bytes=max_bytes, allow_url=allow_url)
+            return read_abs_series(file_path, series_ids, sheet_name, max_series)
+    
+    key = f"abs_series:{url}:{(tuple(series_ids or ()), sheet_name, max_series)!r}"
+    parsed = get_cache().get_or_compute(key, compute, ttl)
+    
+    return {
+        'file_path': None,  # Downloaded to a temporary directory that has been removed
+        'sheet_name': parsed['sheet_name'],
+        'method': method,
+        'series': _downsample_series(parsed, points, method),
+        'source_url': url,
+    }
@@ -1,17 +1,32 @@
 import json
 import os
+import threading
 import requests
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Literal, Optional
 from dotenv import load_dotenv
-from excel_utils import excel_to_ai_context_from_url
-from abs import get_abs_data, get_excel_urls_only
+from excel_utils import excel_to_ai_context_from_url, excel_to_chart_data_from_url_cached
+from abs import get_abs_data_cached, get_excel_urls_only, is_abs_url
+from admission import AdmissionController
+from refresh import refresh_category
+from search_index import SeriesIndex, DEFAULT_INDEX_PATH
 
 load_dotenv()
 
 app = FastAPI(title="GovHack Backend API", description="API for querying Australian Bureau of Statistics data")
 
+# Limits for /api/ask, configured with ASK_MAX_CONCURRENCY, ASK_MAX_QUEUE,
+# ASK_QUEUE_TIMEOUT, ASK_RATE_PER_MINUTE and ASK_BURST (enforced per worker process).
+# ASK_TRUSTED_PROXIES lists the proxies (e.g. the Next.js server) whose
+# X-Forwarded-For header identifies the real client.
+ask_admission = AdmissionController.from_env("ASK")
+
+# Largest workbook /api/chart will download, configured with CHART_MAX_DOWNLOAD_BYTES
+CHART_MAX_DOWNLOAD_BYTES = int(os.getenv("CHART_MAX_DOWNLOAD_BYTES", 50 * 1024 * 1024))
+CHART_MAX_POINTS = 5000
+
 def load_context():
     try:
         with open("metadata.json", "r") as f:
@@ -21,6 +36,35 @@ def load_context():
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Invalid JSON in metadata.json")
 
+_series_index = None
+_series_index_stat = None
+_series_index_lock = threading.Lock()
+
+def load_series_index() -> SeriesIndex:
+    """
+    Return the mapped search index, reopening it if the file was rebuilt since it was opened.
+    """
+    global _series_index, _series_index_stat
+    try:
+        stat = os.stat(DEFAULT_INDEX_PATH)
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="Search index not built; run 'python search_index.py build'")
+    
+    # write_index replaces the file atomically, so a new inode or mtime means a rebuilt index
+    signature = (stat.st_ino, stat.st_mtime_ns)
+    with _series_index_lock:
+        if _series_index is None or signature != _series_index_stat:
+            try:
+                index = SeriesIndex(DEFAULT_INDEX_PATH)
+            except FileNotFoundError:
+                raise HTTPException(status_code=503, detail="Search index not built; run 'python search_index.py build'")
+            except ValueError as e:
+                raise HTTPException(status_code=500, detail=str(e))
+            # Other threads may still be searching the old index, so it is not
+            # closed here; its mapping is released once the last search drops it
+            _series_index, _series_index_stat = index, signature
+        return _series_index
+
 # Request model
 class AskRequest(BaseModel):
     question: str
@@ -54,15 +98,53 @@ class ABSResponse(BaseModel):
     data: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
 
+# Request model for series search endpoint
+class SearchRequest(BaseModel):
+    query: str
+    limit: int = Field(10, ge=1, le=100)
+    category_id: Optional[str] = None
+
+# Response model for series search endpoint
+class SearchResponse(BaseModel):
+    results: List[Dict[str, Any]]
+
+# Request model for chart data endpoint
+class ChartRequest(BaseModel):
+    url: str
+    series_ids: Optional[List[str]] = None
+    sheet_name: Optional[str] = None
+    points: int = Field(200, ge=3, le=CHART_MAX_POINTS)
+    method: Literal["lttb", "minmax"] = "lttb"
+
+# Response model for chart data endpoint
+class ChartResponse(BaseModel):
+    success: bool
+    message: str
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
 @app.get("/api")
 async def root():
     return {"message": "GovHack Backend API is running"}
 
 @app.post("/api/ask", response_model=AskResponse)
-async def ask_question(request: AskRequest):
+async def ask_question(request: AskRequest, http_request: Request):
     """
     Ask a question about Australian Bureau of Statistics data.
     The context from metadata.json will be used to provide relevant information.
+    Requests are rate limited per client address and rejected with
+    429/503 and Retry-After when the server is saturated.
+    """
+    # api_key is chosen by the caller and not checked before the OpenAI call,
+    # so it cannot identify callers: a fresh string would get a fresh bucket
+    caller = ask_admission.client_address(http_request)
+    async with ask_admission.admit(caller):
+        # The OpenAI and ABS calls block, so run them off the event loop
+        return await run_in_threadpool(answer_question, request)
+
+def answer_question(request: AskRequest) -> AskResponse:
+    """
+    Answer a question using the OpenAI API and ABS data.
     """
     try:
         # Load context from metadata.json
@@ -107,7 +189,7 @@ async def ask_question(request: AskRequest):
         answer = response_data.get("choices", [{}])[0].get("message", {}).get("content", "No response received")
         # answer = "8752.0"
 
-        datasets = get_abs_data(answer)
+        datasets = get_abs_data_cached(answer)
 
         summary_payload = {
             "model": "gpt-4o",
@@ -231,6 +313,60 @@ async def ask_question(request: AskRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/api/search", response_model=SearchResponse)
+def search_series(request: SearchRequest):
+    """
+    Search series descriptions, table titles and series IDs across all categories.
+    Uses the prebuilt on-disk index instead of querying ABS or the LLM.
+    Declared without async so FastAPI runs the search in its threadpool.
+    """
+    index = load_series_index()
+    return SearchResponse(results=index.search(request.query, request.limit, request.category_id))
+
+@app.post("/api/refresh/{category_id}", response_model=ABSResponse)
+async def refresh_category_files(category_id: str, full: bool = False):
+    """
+    Refresh the downloaded workbooks for a category.
+    By default only tables whose series changed since the last refresh are downloaded again.
+    """
+    try:
+        # Fetching and parsing workbooks blocks, so run it off the event loop
+        result = await run_in_threadpool(refresh_category, category_id, incremental=not full)
+        return ABSResponse(
+            success=not result['failed'],
+            message=f"{len(result['updated'])} tables updated, {len(result['unchanged'])} unchanged",
+            data=result
+        )
+    except Exception as e:
+        return ABSResponse(success=False, message=f"Failed to refresh category {category_id}", error=str(e))
+
+@app.post("/api/chart", response_model=ChartResponse)
+async def chart_data(request: ChartRequest):
+    """
+    Get chart-ready series from an ABS workbook, downsampled to a fixed number of points.
+    Each series is returned as parallel arrays of timestamps (epoch milliseconds) and values.
+    """
+    # Only ABS workbooks are fetched; redirects are checked against the same rule
+    if not is_abs_url(request.url):
+        raise HTTPException(status_code=400, detail="Only ABS (abs.gov.au) workbook URLs are supported")
+
+    try:
+        data = await run_in_threadpool(
+            excel_to_chart_data_from_url_cached,
+            request.url, request.series_ids, request.sheet_name, request.points, request.method,
+            max_bytes=CHART_MAX_DOWNLOAD_BYTES, allow_url=is_abs_url
+        )
+        return ChartResponse(
+            success=True,
+            message=f"{len(data['series'])} series downsampled to at most {request.points} points",
+            data=data
+        )
+    except Exception as e:
+        # Details stay in the server log; they can describe internal hosts or paths
+        print(f"Error building chart data for {request.url}: {str(e)}")
+        return ChartResponse(success=False, message="Failed to build chart data",
+                             error="The workbook could not be downloaded or read")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8004)
@@ -0,0 +1,265 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+
+from abs import get_abs_data
+from cache import get_cache
+from excel_utils import download_excel_file, find_abs_series_sheets, read_excel_data
+
+
+DEFAULT_SNAPSHOT_DIR = "./snapshots"
+CHANGELOG_FILENAME = "changelog.jsonl"
+
+# Series fields that change when ABS publishes new observations for a table
+CHANGE_FIELDS = ['series_end', 'no_obs', 'product_release_date']
+
+
+def table_signatures(series_data: List[Dict[str, Any]]) -> Dict[str, Dict[str, List[Optional[str]]]]:
+    """
+    Group series by table_url and record the fields that indicate new data.
+
+    Args:
+        series_data (List[Dict[str, Any]]): The 'series_data' list from get_abs_data
+
+    Returns:
+        Dict[str, Dict[str, List[Optional[str]]]]: Mapping of table_url to
+            {series_id: [series_end, no_obs, product_release_date]}
+    """
+    signatures = {}
+    for series in series_data:
+        table_url = series.get('table_url')
+        if not table_url:
+            continue
+        signatures.setdefault(table_url, {})[series.get('series_id') or ''] = [
+            series.get(field) for field in CHANGE_FIELDS
+        ]
+    return signatures
+
+
+def load_snapshot(category_id: str, snapshot_dir: str = DEFAULT_SNAPSHOT_DIR) -> Dict[str, Any]:
+    """
+    Load the last stored refresh snapshot for a category.
+
+    Args:
+        category_id (str): The ABS category ID
+        snapshot_dir (str): Directory holding snapshot files
+
+    Returns:
+        Dict[str, Any]: Snapshot with a 'tables' mapping, or an empty snapshot if none exists
+    """
+    snapshot_path = os.path.join(snapshot_dir, f"{category_id}.json")
+    if not os.path.exists(snapshot_path):
+        return {'category_id': category_id, 'tables': {}}
+
+    try:
+        with open(snapshot_path, "r") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        print(f"Warning: Ignoring unreadable snapshot {snapshot_path}")
+        return {'category_id': category_id, 'tables': {}}
+
+
+def save_snapshot(snapshot: Dict[str, Any], snapshot_dir: str = DEFAULT_SNAPSHOT_DIR) -> str:
+    """
+    Atomically write a category snapshot.
+
+    Args:
+        snapshot (Dict[str, Any]): Snapshot to write; must contain 'category_id'
+        snapshot_dir (str): Directory holding snapshot files
+
+    Returns:
+        str: The path to the written snapshot
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    snapshot_path = os.path.join(snapshot_dir, f"{snapshot['category_id']}.json")
+
+    fd, tmp_path = tempfile.mkstemp(dir=snapshot_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(tmp_path, snapshot_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    return snapshot_path
+
+
+def diff_tables(previous: Dict[str, Any], current: Dict[str, Dict[str, List[Optional[str]]]]) -> Dict[str, str]:
+    """
+    Work out which tables need to be downloaded again.
+
+    Args:
+        previous (Dict[str, Any]): The 'tables' mapping from the stored snapshot
+        current (Dict[str, Dict[str, List[Optional[str]]]]): Signatures from table_signatures
+
+    Returns:
+        Dict[str, str]: Mapping of table_url to reason ('new', 'changed' or 'missing file')
+            for every table that must be refreshed
+    """
+    changes = {}
+    for table_url, series in current.items():
+        stored = previous.get(table_url)
+        if stored is None:
+            changes[table_url] = 'new'
+        elif stored.get('series') != series:
+            changes[table_url] = 'changed'
+        elif not stored.get('file_path') or not os.path.exists(stored['file_path']):
+            changes[table_url] = 'missing file'
+    return changes
+
+
+def parse_data_sheets(file_path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Parse every ABS time series sheet of a workbook.
+
+    The Index and Enquiries sheets are skipped; each data sheet is read with its
+    'Series ID' row as the header, so the columns are the series IDs.
+
+    Args:
+        file_path (str): Path to the Excel file
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Mapping of sheet name to {'shape', 'series_ids'}
+
+    Raises:
+        ValueError: If the workbook has no ABS time series sheet
+    """
+    layouts = find_abs_series_sheets(file_path)
+    if not layouts:
+        raise ValueError(f"No ABS time series sheet found in {file_path}")
+
+    sheets = {}
+    for layout in layouts:
+        parsed = read_excel_data(file_path, layout['sheet_name'], header_row=layout['series_id_row'])
+        sheets[layout['sheet_name']] = {
+            'shape': list(parsed['shape']),
+            'series_ids': [series['series_id'] for series in layout['series']],
+        }
+    return sheets
+
+
+def refresh_category(category_id: str, incremental: bool = True,
+                     snapshot_dir: str = DEFAULT_SNAPSHOT_DIR) -> Dict[str, Any]:
+    """
+    Refresh the downloaded workbooks for a category.
+
+    In incremental mode the current series metadata is compared against the last
+    snapshot and only workbooks whose series changed are downloaded and their
+    data sheets parsed again; every other table reuses the file from the
+    previous refresh. A table that fails to refresh keeps its old snapshot
+    entry so it is retried next time.
+
+    Args:
+        category_id (str): The ABS category ID
+        incremental (bool): Only refresh changed tables. If False, refresh every table.
+        snapshot_dir (str): Directory holding snapshot files and the change log
+
+    Returns:
+        Dict[str, Any]: Dictionary containing:
+            - 'category_id': The category refreshed
+            - 'updated': List of change log entries for tables that were refreshed
+            - 'unchanged': List of table URLs that were reused
+            - 'failed': List of {'table_url', 'error'} for tables that could not be refreshed
+            - 'removed': List of table URLs that are no longer published for the category
+            - 'files': Mapping of table_url to local file path
+
+    Raises:
+        RuntimeError: If another refresh of the same category is already running
+        requests.RequestException: If the ABS API request fails
+        Exception: For other errors
+    """
+    # Only one worker at a time may rewrite a category's snapshot and change log
+    lock_key = f"refresh:{os.path.abspath(snapshot_dir)}:{category_id}"
+    with get_cache().lock(lock_key, timeout=0) as acquired:
+        if not acquired:
+            raise RuntimeError(f"A refresh of category {category_id} is already running")
+        return _refresh_category(category_id, incremental, snapshot_dir)
+
+
+def _refresh_category(category_id: str, incremental: bool, snapshot_dir: str) -> Dict[str, Any]:
+    data = get_abs_data(category_id)
+    current = table_signatures(data['series_data'])
+
+    snapshot = load_snapshot(category_id, snapshot_dir)
+    previous = snapshot.get('tables', {})
+
+    if incremental:
+        changes = diff_tables(previous, current)
+    else:
+        changes = {table_url: 'full refresh' for table_url in current}
+
+    refreshed_at = datetime.now(timezone.utc).isoformat()
+    tables = {table_url: entry for table_url, entry in previous.items() if table_url in current}
+    updated = []
+    failed = []
+
+    for table_url, reason in changes.items():
+        try:
+            file_path = download_excel_file(table_url)
+            sheets = parse_data_sheets(file_path)
+        except Exception as e:
+            print(f"Warning: Could not refresh {table_url}: {str(e)}")
+            failed.append({'table_url': table_url, 'error': str(e)})
+            continue
+
+        old_series = previous.get(table_url, {}).get('series', {})
+        new_series = current[table_url]
+        tables[table_url] = {
+            'series': new_series,
+            'file_path': file_path,
+            'sheets': sheets,
+            'refreshed_at': refreshed_at,
+        }
+        updated.append({
+            'timestamp': refreshed_at,
+            'category_id': category_id,
+            'table_url': table_url,
+            'reason': reason,
+            'changed_series': sorted(
+                series_id for series_id, fields in new_series.items()
+                if old_series.get(series_id) != fields
+            ),
+            'file_path': file_path,
+        })
+
+    removed = sorted(set(previous) - set(current))
+    snapshot = {'category_id': category_id, 'refreshed_at': refreshed_at, 'tables': tables}
+    save_snapshot(snapshot, snapshot_dir)
+
+    if updated:
+        with open(os.path.join(snapshot_dir, CHANGELOG_FILENAME), "a") as f:
+            for entry in updated:
+                f.write(json.dumps(entry) + "\n")
+
+    unchanged = sorted(table_url for table_url in current if table_url not in changes)
+
+    print(f"Refreshed category {category_id}: {len(updated)} updated, "
+          f"{len(unchanged)} unchanged, {len(failed)} failed, {len(removed)} removed")
+
+    return {
+        'category_id': category_id,
+        'updated': updated,
+        'unchanged': unchanged,
+        'failed': failed,
+        'removed': removed,
+        'files': {table_url: entry['file_path'] for table_url, entry in tables.items()},
+    }
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+
+    test_category_id = sys.argv[1] if len(sys.argv) > 1 else "5232.0.55.001"
+    full = "--full" in sys.argv
+
+    try:
+        result = refresh_category(test_category_id, incremental=not full)
+        for entry in result['updated']:
+            print(f"{entry['reason']:>12}  {entry['table_url']}  ({len(entry['changed_series'])} series)")
+    except Exception as e:
+        print(f"Error: {str(e)}")
@@ -0,0 +1,368 @@
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import tempfile
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+
+from abs import get_abs_data
+
+
+# On-disk layout (all integers little-endian):
+#
+#   header      MAGIC, version, doc count, term count, average doc length,
+#               then the byte offset of each section below
+#   doc_lengths uint32 per document (token count used for BM25 normalisation)
+#   doc_cats    uint32 per document, index of its category in categories
+#   doc_offsets uint64 per document + 1, byte offsets into doc_blob
+#   doc_blob    UTF-8 JSON record per document, concatenated
+#   term_offs   uint64 per term + 1, byte offsets into term_blob
+#   term_blob   UTF-8 terms in sorted order, concatenated
+#   post_offs   uint64 per term + 1, entry offsets into postings
+#   postings    (doc id uint32, term frequency uint32) pairs grouped by term
+#   categories  UTF-8 JSON array of category IDs, to the end of the file
+#
+# Terms are sorted so lookups are a binary search straight over the mapped
+# file; document records are only decoded for the hits that get returned.
+# The uint32 sections are read through memoryviews in native byte order, so
+# the index is only portable between little-endian hosts.
+MAGIC = b"ABSIDX\x00\x01"
+VERSION = 2
+HEADER = struct.Struct("<8sIIId9Q")
+POSTING = struct.Struct("<II")
+DEFAULT_INDEX_PATH = "series_index.bin"
+
+# Fields indexed per series and how much a match in each one counts
+FIELD_WEIGHTS = {
+    'series_id': 3,
+    'table_title': 2,
+    'description': 1,
+}
+
+# Fields kept in the stored record for each hit
+DOC_FIELDS = [
+    'category_id', 'series_id', 'description', 'table_title', 'table_url',
+    'product_title', 'product_url', 'unit', 'frequency', 'series_end',
+]
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text into lowercase alphanumeric search terms.
+
+    Args:
+        text (str, optional): Text to tokenize
+
+    Returns:
+        List[str]: List of terms, in order of appearance
+    """
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def collect_series_documents(context_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fetch series metadata for every category in metadata.json.
+
+    Categories that fail to load are reported and skipped so a single bad
+    catalogue number does not prevent the rest of the index being built.
+
+    Args:
+        context_data (List[Dict[str, Any]]): Parsed contents of metadata.json
+
+    Returns:
+        List[Dict[str, Any]]: One document per series with the DOC_FIELDS keys
+    """
+    documents = []
+    for category in context_data:
+        category_id = category.get('catId')
+        if not category_id:
+            continue
+        try:
+            data = get_abs_data(category_id)
+        except Exception as e:
+            print(f"Warning: Skipping category {category_id}: {str(e)}")
+            continue
+
+        for series in data['series_data']:
+            document = {field: series.get(field) for field in DOC_FIELDS}
+            document['category_id'] = category_id
+            documents.append(document)
+
+    return documents
+
+
+def write_index(documents: List[Dict[str, Any]], index_path: str = DEFAULT_INDEX_PATH) -> str:
+    """
+    Build an inverted index over series documents and write it to disk.
+
+    The file is written to a temporary path first and moved into place, so a
+    running server never maps a half-written index.
+
+    Args:
+        documents (List[Dict[str, Any]]): Series documents to index
+        index_path (str): Where to write the index file
+
+    Returns:
+        str: The path to the written index
+    """
+    postings = defaultdict(list)
+    doc_lengths = []
+    doc_categories = []
+    doc_blobs = []
+    category_ordinals = {}
+
+    for doc_id, document in enumerate(documents):
+        term_counts = defaultdict(int)
+        length = 0
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(document.get(field)):
+                term_counts[term] += weight
+                length += 1
+        for term, count in term_counts.items():
+            postings[term].append((doc_id, count))
+        doc_lengths.append(length)
+        doc_categories.append(category_ordinals.setdefault(document.get('category_id'), len(category_ordinals)))
+        doc_blobs.append(json.dumps(document, separators=(',', ':')).encode('utf-8'))
+
+    terms = sorted(postings)
+    term_blobs = [term.encode('utf-8') for term in terms]
+    avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+    def offsets(blobs):
+        result = [0]
+        for blob in blobs:
+            result.append(result[-1] + len(blob))
+        return result
+
+    post_offsets = [0]
+    for term in terms:
+        post_offsets.append(post_offsets[-1] + len(postings[term]))
+
+    sections = [
+        struct.pack(f"<{len(doc_lengths)}I", *doc_lengths),
+        struct.pack(f"<{len(doc_categories)}I", *doc_categories),
+        struct.pack(f"<{len(doc_blobs) + 1}Q", *offsets(doc_blobs)),
+        b"".join(doc_blobs),
+        struct.pack(f"<{len(term_blobs) + 1}Q", *offsets(term_blobs)),
+        b"".join(term_blobs),
+        struct.pack(f"<{len(terms) + 1}Q", *post_offsets),
+        b"".join(POSTING.pack(doc_id, count) for term in terms for doc_id, count in postings[term]),
+        json.dumps(list(category_ordinals)).encode('utf-8'),
+    ]
+
+    section_offsets = []
+    position = HEADER.size
+    for section in sections:
+        section_offsets.append(position)
+        position += len(section)
+
+    header = HEADER.pack(MAGIC, VERSION, len(documents), len(terms), avg_length, *section_offsets)
+
+    index_dir = os.path.dirname(os.path.abspath(index_path))
+    os.makedirs(index_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=index_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            for section in sections:
+                f.write(section)
+        os.replace(tmp_path, index_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    print(f"Wrote search index with {len(documents)} series and {len(terms)} terms to: {index_path}")
+    return index_path
+
+
+def build_index(metadata_path: str = "metadata.json", index_path: str = DEFAULT_INDEX_PATH) -> str:
+    """
+    Fetch every category listed in metadata.json and build the series index.
+
+    Args:
+        metadata_path (str): Path to metadata.json
+        index_path (str): Where to write the index file
+
+    Returns:
+        str: The path to the written index
+    """
+    with open(metadata_path, "r") as f:
+        context_data = json.load(f)
+
+    return write_index(collect_series_documents(context_data), index_path)
+
+
+class SeriesIndex:
+    """
+    Read-only, memory-mapped view of an index written by write_index.
+
+    Opening the index reads the header and the category list; terms, postings
+    and documents are read from the mapping as searches touch them. Searches
+    only read the mapping, so one instance can be shared between threads.
+    """
+
+    def __init__(self, index_path: str = DEFAULT_INDEX_PATH):
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"Search index not found: {index_path}")
+
+        self.index_path = index_path
+        self._mm = None
+        self._views = []
+        self._file = open(index_path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            (magic, version, self.doc_count, self.term_count, self.avg_length,
+             self._doc_lengths_at, self._doc_categories_at, self._doc_offsets_at, self._doc_blob_at,
+             self._term_offsets_at, self._term_blob_at, self._post_offsets_at, self._postings_at,
+             self._categories_at) = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Unsupported search index format: {index_path}")
+
+            self._doc_lengths = self._uint32_view(self._doc_lengths_at, self._doc_categories_at)
+            self._doc_categories = self._uint32_view(self._doc_categories_at, self._doc_offsets_at)
+            self._posting_values = self._uint32_view(self._postings_at, self._categories_at)
+            categories = json.loads(self._mm[self._categories_at:])
+            self._category_ordinals = {category: i for i, category in enumerate(categories)}
+        except Exception:
+            self.close()
+            raise
+
+    def _uint32_view(self, start: int, end: int) -> memoryview:
+        view = memoryview(self._mm)[start:end].cast('I')
+        self._views.append(view)
+        return view
+
+    def close(self) -> None:
+        """Release the memory mapping and file handle."""
+        # The mapping cannot be closed while views into it exist
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _u64(self, section: int, position: int) -> int:
+        return struct.unpack_from("<Q", self._mm, section + position * 8)[0]
+
+    def _term(self, term_id: int) -> bytes:
+        start = self._u64(self._term_offsets_at, term_id)
+        end = self._u64(self._term_offsets_at, term_id + 1)
+        return self._mm[self._term_blob_at + start:self._term_blob_at + end]
+
+    def _find_term(self, term: str) -> Optional[int]:
+        target = term.encode('utf-8')
+        low, high = 0, self.term_count
+        while low < high:
+            mid = (low + high) // 2
+            if self._term(mid) < target:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.term_count and self._term(low) == target:
+            return low
+        return None
+
+    def _postings(self, term_id: int) -> Tuple[memoryview, memoryview]:
+        # Doc IDs and frequencies alternate, so strided views split them without copying
+        start = self._u64(self._post_offsets_at, term_id)
+        end = self._u64(self._post_offsets_at, term_id + 1)
+        pairs = self._posting_values[start * 2:end * 2]
+        return pairs[0::2], pairs[1::2]
+
+    def get_document(self, doc_id: int) -> Dict[str, Any]:
+        """
+        Decode the stored record for a document.
+
+        Args:
+            doc_id (int): Document number within the index
+
+        Returns:
+            Dict[str, Any]: The stored series record
+        """
+        start = self._u64(self._doc_offsets_at, doc_id)
+        end = self._u64(self._doc_offsets_at, doc_id + 1)
+        return json.loads(self._mm[self._doc_blob_at + start:self._doc_blob_at + end])
+
+    def search(self, query: str, limit: int = 10, category_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Rank series against a free-text query using BM25.
+
+        Args:
+            query (str): Free-text query; series IDs are matched as whole terms
+            limit (int): Maximum number of results to return
+            category_id (str, optional): Only return series from this category
+
+        Returns:
+            List[Dict[str, Any]]: Matching series records, best first, each with a 'score'
+        """
+        if limit < 1:
+            return []
+
+        category = None
+        if category_id:
+            category = self._category_ordinals.get(category_id)
+            if category is None:
+                return []
+        doc_categories = self._doc_categories
+        doc_lengths = self._doc_lengths
+        avg_length = self.avg_length or 1
+
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            term_id = self._find_term(term)
+            if term_id is None:
+                continue
+            doc_ids, frequencies = self._postings(term_id)
+            idf = math.log(1 + (self.doc_count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            for doc_id, frequency in zip(doc_ids, frequencies):
+                if category is not None and doc_categories[doc_id] != category:
+                    continue
+                norm = 1 - BM25_B + BM25_B * doc_lengths[doc_id] / avg_length
+                scores[doc_id] += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * norm)
+
+        # Best score first, ties broken by document order
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        results = []
+        for doc_id, score in ranked:
+            document = self.get_document(doc_id)
+            document['score'] = round(score, 4)
+            results.append(document)
+
+        return results
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        build_index()
+    elif len(sys.argv) > 2 and sys.argv[1] == "search":
+        with SeriesIndex() as index:
+            for hit in index.search(" ".join(sys.argv[2:])):
+                print(f"{hit['score']:8.3f}  {hit['series_id']}  {hit['table_title']}")
+                print(f"          {hit['description']}")
+    else:
+        print("Usage: python search_index.py build | search <query>")
@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+from chart_data import METHODS, downsample
+
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("n", [1, 2, 5, 10, 101, 1000])
+def test_downsample_never_returns_more_than_points(method, n):
+    rng = np.random.default_rng(n)
+    x = np.arange(n, dtype=np.int64) * 1000
+    y = rng.normal(size=n).cumsum()
+
+    for points in range(0, 60):
+        keep = downsample(x, y, points, method)
+        assert len(keep) <= max(points, 0)
+        assert np.all(np.diff(keep) > 0)
+        if points >= 2 and n >= 2:
+            assert keep[0] == 0 and keep[-1] == n - 1
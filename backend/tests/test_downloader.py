@@ -0,0 +1,165 @@
+import io
+import json
+import os
+import re
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import cache
+import downloader
+
+
+def make_workbook(size: int) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        archive.writestr('xl/data.bin', os.urandom(size))
+    return buffer.getvalue()
+
+
+class FileServer:
+    """
+    Serves one file. Advertises byte ranges on HEAD; ignore_range makes GETs
+    answer with the whole file anyway, and drop_after cuts every response off
+    after that many bytes.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.ignore_range = False
+        self.drop_after = None
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, body: bytes, status: int, content_range: str = None):
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('ETag', '"v1"')
+                if content_range:
+                    self.send_header('Content-Range', content_range)
+                self.end_headers()
+                if self.command == 'HEAD':
+                    return
+                if server.drop_after is not None and len(body) > server.drop_after:
+                    self.wfile.write(body[:server.drop_after])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+            def do_HEAD(self):
+                self._send(server.data, 200)
+
+            def do_GET(self):
+                match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get('Range', ''))
+                if match and not server.ignore_range:
+                    start = int(match.group(1))
+                    end = int(match.group(2)) if match.group(2) else len(server.data) - 1
+                    self._send(server.data[start:end + 1], 206, f"bytes {start}-{end}/{len(server.data)}")
+                else:
+                    self._send(server.data, 200)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/table.xlsx"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_downloads(monkeypatch):
+    monkeypatch.setattr(cache, '_cache', cache.MemoryCache())
+    monkeypatch.setattr(downloader, 'MAX_RETRIES', 0)
+
+
+@pytest.fixture
+def server():
+    file_server = FileServer(make_workbook(512 * 1024))
+    yield file_server
+    file_server.close()
+
+
+def test_interrupted_stream_fallback_resumes_on_ranged_path(server, tmp_path):
+    save_path = str(tmp_path / "table.xlsx")
+
+    # The server claims range support but ignores it, then drops the stream
+    server.ignore_range = True
+    server.drop_after = 100 * 1024
+    with pytest.raises(requests.RequestException):
+        downloader.download_file(server.url, save_path)
+    with open(save_path + ".part.json") as f:
+        assert json.load(f)['mode'] == 'stream'
+
+    # Once ranges work, the leftover stream state must not be resumed as ranged
+    server.ignore_range = False
+    server.drop_after = None
+    result = downloader.download_file(server.url, save_path)
+
+    assert result['size'] == len(server.data)
+    with open(save_path, 'rb') as f:
+        assert f.read() == server.data
+    assert sorted(os.listdir(tmp_path)) == ["table.xlsx"]
+
+
+def test_saved_state_only_records_bytes_already_in_part_file(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, 'MIN_PART_SIZE', 64 * 1024)
+    monkeypatch.setattr(downloader, 'READ_SIZE', 4 * 1024)
+    monkeypatch.setattr(downloader, 'STATE_SAVE_INTERVAL', 16 * 1024)
+    save_path = str(tmp_path / "table.xlsx")
+    save_state = downloader._save_state
+    holes = []
+
+    # A crash right after any save must leave a state that can be resumed safely
+    def checked_save_state(state_path, state):
+        save_state(state_path, state)
+        if 'ranges' not in state:
+            return
+        with open(save_path + ".part", 'rb') as f:
+            part = f.read()
+        for start, _, written in json.loads(open(state_path).read())['ranges']:
+            if part[start:start + written] != server.data[start:start + written]:
+                holes.append((start, written))
+
+    monkeypatch.setattr(downloader, '_save_state', checked_save_state)
+    result = downloader.download_file(server.url, save_path, parts=4)
+
+    assert result['parts'] == 4
+    assert holes == []
+    with open(save_path, 'rb') as f:
+        assert f.read() == server.data
+
+
+def test_interrupted_ranges_resume(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, 'MIN_PART_SIZE', 64 * 1024)
+    monkeypatch.setattr(downloader, 'READ_SIZE', 4 * 1024)
+    save_path = str(tmp_path / "table.xlsx")
+
+    server.drop_after = 50 * 1024
+    with pytest.raises(requests.RequestException):
+        downloader.download_file(server.url, save_path, parts=4)
+    with open(save_path + ".part.json") as f:
+        assert sum(written for _, _, written in json.load(f)['ranges']) > 0
+
+    server.drop_after = None
+    downloader.download_file(server.url, save_path, parts=4)
+    with open(save_path, 'rb') as f:
+        assert f.read() == server.data
+
+
+def test_corrupt_workbook_is_not_moved_into_place(server, tmp_path):
+    flip = len(server.data) // 2
+    server.data = server.data[:flip] + bytes([server.data[flip] ^ 0xFF]) + server.data[flip + 1:]
+    save_path = str(tmp_path / "table.xlsx")
+
+    with pytest.raises(ValueError):
+        downloader.download_file(server.url, save_path)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,232 @@
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import List, Dict, Any, Optional
+
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+XLSX_EXTENSIONS = ('.xlsx', '.xlsm')
+
+_CELL_REF_RE = re.compile(r"^\$?([A-Z]+)\$?(\d+)$")
+
+
+def is_xlsx_file(file_path: str) -> bool:
+    """
+    Check whether a file is an Office Open XML workbook that can be inspected.
+
+    Args:
+        file_path (str): Path to the Excel file
+
+    Returns:
+        bool: True for .xlsx/.xlsm zip packages, False otherwise (e.g. legacy .xls)
+    """
+    return file_path.lower().endswith(XLSX_EXTENSIONS) and zipfile.is_zipfile(file_path)
+
+
+def column_index(letters: str) -> int:
+    """
+    Convert a column name such as 'A' or 'CS' to a 1-based column number.
+    """
+    index = 0
+    for letter in letters:
+        index = index * 26 + (ord(letter) - ord('A') + 1)
+    return index
+
+
+def parse_cell_ref(ref: str) -> Optional[Dict[str, int]]:
+    """
+    Split a cell reference such as 'B11' into 1-based row and column numbers.
+
+    Args:
+        ref (str): A cell reference
+
+    Returns:
+        Dict[str, int], optional: {'row', 'column'}, or None if ref is not a cell reference
+    """
+    match = _CELL_REF_RE.match(ref.strip().upper())
+    if not match:
+        return None
+    return {'row': int(match.group(2)), 'column': column_index(match.group(1))}
+
+
+def _sheet_paths(archive: zipfile.ZipFile) -> List[Dict[str, Any]]:
+    rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {}
+    for rel in rels.iter(f"{{{PKG_REL_NS}}}Relationship"):
+        target = rel.get('Target', '')
+        if target.startswith('/'):
+            target = target.lstrip('/')
+        else:
+            target = posixpath.normpath(posixpath.join("xl", target))
+        targets[rel.get('Id')] = target
+
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    sheets = []
+    for sheet in workbook.iter(f"{{{MAIN_NS}}}sheet"):
+        sheets.append({
+            'name': sheet.get('name'),
+            'state': sheet.get('state', 'visible'),
+            'path': targets.get(sheet.get(f"{{{REL_NS}}}id")),
+        })
+    return sheets
+
+
+def _shared_strings(archive: zipfile.ZipFile, needed: set) -> Dict[int, str]:
+    # Stream the shared string table and stop once every index we need is resolved
+    if not needed or "xl/sharedStrings.xml" not in archive.namelist():
+        return {}
+
+    strings = {}
+    last_needed = max(needed)
+    position = 0
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, elem in ET.iterparse(f, events=('end',)):
+            if elem.tag != f"{{{MAIN_NS}}}si":
+                continue
+            if position in needed:
+                strings[position] = "".join(t.text or "" for t in elem.iter(f"{{{MAIN_NS}}}t"))
+            elem.clear()
+            position += 1
+            if position > last_needed:
+                break
+    return strings
+
+
+def _probe_sheet(archive: zipfile.ZipFile, path: str, header_rows: int) -> Dict[str, Any]:
+    # Read the <dimension> element and the first few rows, then stop parsing;
+    # the rest of the sheet part is never decompressed.
+    dimension = None
+    rows = []
+    with archive.open(path) as f:
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if elem.tag == f"{{{MAIN_NS}}}dimension":
+                    dimension = elem.get('ref')
+                    if header_rows == 0:
+                        break
+                continue
+            if elem.tag != f"{{{MAIN_NS}}}row":
+                continue
+            row_number = int(elem.get('r', len(rows) + 1))
+            if row_number > header_rows:
+                break
+            cells = []
+            for cell in elem.iter(f"{{{MAIN_NS}}}c"):
+                ref = parse_cell_ref(cell.get('r', ''))
+                cell_type = cell.get('t', 'n')
+                if cell_type == 'inlineStr':
+                    value = "".join(t.text or "" for t in cell.iter(f"{{{MAIN_NS}}}t"))
+                else:
+                    value_elem = cell.find(f"{{{MAIN_NS}}}v")
+                    value = value_elem.text if value_elem is not None else None
+                cells.append({
+                    'column': ref['column'] if ref else len(cells) + 1,
+                    'type': cell_type,
+                    'value': value,
+                })
+            rows.append({'row': row_number, 'cells': cells})
+            elem.clear()
+    return {'dimension': dimension, 'rows': rows}
+
+
+def inspect_workbook(file_path: str, header_rows: int = 5) -> Dict[str, Any]:
+    """
+    List the sheets of an xlsx workbook with their size and first few rows.
+
+    Only workbook.xml, its relationships, the top of each sheet part and as much
+    of the shared string table as the header rows need are read, so this stays
+    fast regardless of how much data the workbook holds.
+
+    Args:
+        file_path (str): Path to the .xlsx/.xlsm file
+        header_rows (int): Number of leading rows to return for each sheet
+
+    Returns:
+        Dict[str, Any]: Dictionary containing:
+            - 'file_path': Path to the file
+            - 'sheet_names': List of sheet names in workbook order
+            - 'sheets': List of dictionaries with 'name', 'state', 'dimension',
+              'rows' and 'columns' (extent counted from A1, or None if the sheet
+              has no <dimension>) and 'header' (the first header_rows rows, each
+              a list of raw cell values up to the row's last used column)
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the file is not an xlsx workbook
+        Exception: For other reading errors
+    """
+    try:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        if not is_xlsx_file(file_path):
+            raise ValueError(f"Not an xlsx workbook: {file_path}")
+
+        with zipfile.ZipFile(file_path) as archive:
+            sheets = _sheet_paths(archive)
+            probes = [
+                _probe_sheet(archive, sheet['path'], header_rows) if sheet['path'] in archive.namelist()
+                else {'dimension': None, 'rows': []}
+                for sheet in sheets
+            ]
+
+            needed = {
+                int(cell['value'])
+                for probe in probes for row in probe['rows'] for cell in row['cells']
+                if cell['type'] == 's' and cell['value'] is not None
+            }
+            strings = _shared_strings(archive, needed)
+
+        for sheet, probe in zip(sheets, probes):
+            dimension = probe['dimension']
+            end = parse_cell_ref(dimension.split(':')[-1]) if dimension else None
+            sheet['dimension'] = dimension
+            sheet['rows'] = end['row'] if end else None
+            sheet['columns'] = end['column'] if end else None
+
+            # Rows missing from the sheet part are empty; keep them so header[i] is row i + 1
+            header = [[] for _ in range(max((row['row'] for row in probe['rows']), default=0))]
+            for row in probe['rows']:
+                width = max((cell['column'] for cell in row['cells']), default=0)
+                values = [None] * width
+                for cell in row['cells']:
+                    value = cell['value']
+                    if cell['type'] == 's' and value is not None:
+                        value = strings.get(int(value))
+                    values[cell['column'] - 1] = value
+                header[row['row'] - 1] = values
+            sheet['header'] = header
+            del sheet['path']
+
+        return {
+            'file_path': file_path,
+            'sheet_names': [sheet['name'] for sheet in sheets],
+            'sheets': sheets,
+        }
+
+    except (FileNotFoundError, ValueError):
+        raise
+    except Exception as e:
+        raise Exception(f"Error inspecting workbook {file_path}: {str(e)}")
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+    import time
+
+    test_file = sys.argv[1] if len(sys.argv) > 1 else "./files/excel_fd0dc139.xlsx"
+
+    start = time.perf_counter()
+    info = inspect_workbook(test_file)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print(f"Inspected {test_file} in {elapsed:.1f} ms")
+    for sheet in info['sheets']:
+        print(f"{sheet['name']}: {sheet['rows']} rows x {sheet['columns']} columns ({sheet['dimension']})")
+        for row in sheet['header']:
+            print(f"   {row[:4]}")
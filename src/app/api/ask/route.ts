@@ -3,9 +3,14 @@ import { NextRequest, NextResponse } from "next/server";
 
 export async function POST(req: NextRequest) {
   const body = await req.json();
+  // Pass the client address on so the backend rate limits each user, not this server
+  const forwardedFor = req.headers.get("x-forwarded-for");
   const backendRes = await fetch("https://govhack.koso.dev/api/ask", {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: {
+      "Content-Type": "application/json",
+      ...(forwardedFor ? { "X-Forwarded-For": forwardedFor } : {}),
+    },
     body: JSON.stringify(body),
   });
   const data = await backendRes.json();